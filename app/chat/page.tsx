@@ -6,7 +6,7 @@ import { ProtectedRoute } from '@/components/auth/ProtectedRoute';
 import { ChatWindow } from '@/components/chat/ChatWindow';
 import { ConversationSidebar } from '@/components/chat/ConversationSidebar';
 import { useAuth } from '@/contexts/AuthContext';
-import { chatApi, Message, Conversation } from '@/lib/api/chat';
+import { chatApi, Message, Conversation, CONVERSATIONS_PAGE_SIZE } from '@/lib/api/chat';
 import { ApiError } from '@/lib/api/client';
 
 function ChatPageContent() {
@@ -14,6 +14,7 @@ function ChatPageContent() {
   const router = useRouter();
   const [messages, setMessages] = useState<Message[]>([]);
   const [conversations, setConversations] = useState<Conversation[]>([]);
+  const [hasMoreConversations, setHasMoreConversations] = useState(false);
   const [currentConversationId, setCurrentConversationId] = useState<string | undefined>();
   const [isLoading, setIsLoading] = useState(false);
   const [error, setError] = useState('');
@@ -47,6 +48,21 @@ function ChatPageContent() {
     try {
       const data = await chatApi.getConversations();
       setConversations(data);
+      setHasMoreConversations(data.length === CONVERSATIONS_PAGE_SIZE);
+    } catch (err) {
+      console.error('Failed to load conversations:', err);
+    }
+  };
+
+  const loadMoreConversations = async () => {
+    const last = conversations[conversations.length - 1];
+    if (!last) {
+      return;
+    }
+    try {
+      const data = await chatApi.getConversations(last.updatedAt);
+      setConversations((prev) => [...prev, ...data]);
+      setHasMoreConversations(data.length === CONVERSATIONS_PAGE_SIZE);
     } catch (err) {
       console.error('Failed to load conversations:', err);
     }
@@ -71,34 +87,59 @@ function ChatPageContent() {
     setIsLoading(true);
     setError('');
 
-    try {
-      const response = await chatApi.sendMessage({
-        message: messageText,
+    // Show the user message and an empty assistant bubble that fills in as tokens arrive
+    const now = Date.now();
+    const userMessage: Message = {
+      id: `temp-${now}`,
+      content: messageText,
+      role: 'user',
+      timestamp: new Date().toISOString(),
+      conversationId: currentConversationId,
+    };
+    const pendingId = `temp-assistant-${now}`;
+    setMessages((prev) => [
+      ...prev,
+      userMessage,
+      {
+        id: pendingId,
+        content: '',
+        role: 'assistant',
+        timestamp: new Date().toISOString(),
         conversationId: currentConversationId,
-      });
+      },
+    ]);
 
-      // Add user message
-      const userMessage: Message = {
-        id: `temp-${Date.now()}`,
-        content: messageText,
-        role: 'user',
-        timestamp: new Date().toISOString(),
-        conversationId: response.conversationId,
-      };
-      setMessages((prev) => [...prev, userMessage]);
+    try {
+      const response = await chatApi.streamMessage(
+        {
+          message: messageText,
+          conversationId: currentConversationId,
+        },
+        {
+          onToken: (token) => {
+            setMessages((prev) =>
+              prev.map((msg) =>
+                msg.id === pendingId ? { ...msg, content: msg.content + token } : msg
+              )
+            );
+          },
+        }
+      );
+
+      // Replace the pending bubble with the stored assistant message
+      setMessages((prev) =>
+        prev.map((msg) => (msg.id === pendingId ? response.message : msg))
+      );
 
       // Update conversation ID if it's a new conversation
       if (!currentConversationId) {
         setCurrentConversationId(response.conversationId);
-        await loadConversations();
       }
 
-      // Add assistant response
-      setMessages((prev) => [...prev, response.message]);
-
       // Reload conversations to update the list
       await loadConversations();
     } catch (err) {
+      setMessages((prev) => prev.filter((msg) => msg.id !== pendingId));
       if (err instanceof ApiError) {
         setError(err.message || 'Failed to send message');
       } else {
@@ -146,6 +187,8 @@ function ChatPageContent() {
         onSelectConversation={handleSelectConversation}
         onNewConversation={handleNewConversation}
         onDeleteConversation={handleDeleteConversation}
+        hasMore={hasMoreConversations}
+        onLoadMore={loadMoreConversations}
       />
 
       {/* Main Chat Area */}
@@ -2,6 +2,7 @@
 
 import { useState } from 'react';
 import { useRouter } from 'next/navigation';
+import { apiClient } from '@/lib/api/client';
 
 export default function LoginPage() {
   const [email, setEmail] = useState('');
@@ -22,8 +23,10 @@ export default function LoginPage() {
       if (!response.ok) throw new Error('Login failed');
       
       const data = await response.json();
-      localStorage.setItem('auth_token', data.token);
-      localStorage.setItem('auth_user_id', email);  
+      apiClient.setToken(data.token);
+      // Access tokens are short-lived; the client renews them with this on a 401
+      apiClient.setRefreshToken(data.refreshToken ?? null);
+      apiClient.setUserId(email);
       router.push('/chat');
     } catch (err) {
       setError('Invalid credentials');
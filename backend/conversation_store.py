@@ -0,0 +1,158 @@
+import os
+from datetime import datetime, timezone
+from typing import Optional
+
+import redis.asyncio as redis
+from dotenv import load_dotenv
+
+load_dotenv()
+
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+MAX_MESSAGES_PER_CONVERSATION = int(os.getenv("MAX_MESSAGES_PER_CONVERSATION", "200"))
+CONVERSATION_TTL_SECONDS = int(os.getenv("CONVERSATION_TTL_SECONDS", str(30 * 24 * 3600)))
+
+# Key layout:
+#   convs:{user_id}                 sorted set of conversation ids scored by updated_at
+#   conv:{user_id}:{conv_id}        list of JSON-encoded messages, oldest first
+#   conv:{user_id}:{conv_id}:meta   hash with title, created_at, updated_at, message_count
+_redis = redis.Redis.from_url(REDIS_URL, decode_responses=True)
+
+# Writes run as scripts that first check the meta hash still exists, so a write racing
+# a delete cannot recreate a partial conversation (meta without created_at).
+# KEYS: messages, meta, index. ARGV: message_json, max_messages, ttl, score, conv_id, field/value...
+_append_script = _redis.register_script("""
+if redis.call('EXISTS', KEYS[2]) == 0 then
+    return 0
+end
+redis.call('RPUSH', KEYS[1], ARGV[1])
+redis.call('LTRIM', KEYS[1], -tonumber(ARGV[2]), -1)
+for i = 6, #ARGV, 2 do
+    redis.call('HSET', KEYS[2], ARGV[i], ARGV[i + 1])
+end
+-- Counts every message sent, including ones later trimmed from the list
+redis.call('HINCRBY', KEYS[2], 'message_count', 1)
+redis.call('ZADD', KEYS[3], ARGV[4], ARGV[5])
+redis.call('EXPIRE', KEYS[1], ARGV[3])
+redis.call('EXPIRE', KEYS[2], ARGV[3])
+redis.call('EXPIRE', KEYS[3], ARGV[3])
+return 1
+""")
+
+# KEYS: messages, meta, index. ARGV: updated_at, score, conv_id
+_clear_script = _redis.register_script("""
+if redis.call('EXISTS', KEYS[2]) == 0 then
+    return 0
+end
+redis.call('DEL', KEYS[1])
+redis.call('HSET', KEYS[2], 'updated_at', ARGV[1], 'message_count', 0)
+redis.call('ZADD', KEYS[3], ARGV[2], ARGV[3])
+return 1
+""")
+
+
+async def close_store() -> None:
+    await _redis.aclose()
+
+
+def _index_key(user_id: str) -> str:
+    return f"convs:{user_id}"
+
+
+def _messages_key(user_id: str, conv_id: str) -> str:
+    return f"conv:{user_id}:{conv_id}"
+
+
+def _meta_key(user_id: str, conv_id: str) -> str:
+    return f"conv:{user_id}:{conv_id}:meta"
+
+
+def timestamp_score(iso_timestamp: str) -> float:
+    """Convert a naive UTC ISO timestamp into a sorted-set score."""
+    return datetime.fromisoformat(iso_timestamp).replace(tzinfo=timezone.utc).timestamp()
+
+
+async def create_conversation(user_id: str, conv_id: str, meta: dict[str, str]) -> None:
+    async with _redis.pipeline(transaction=True) as pipe:
+        pipe.hset(_meta_key(user_id, conv_id), mapping={**meta, "message_count": 0})
+        pipe.expire(_meta_key(user_id, conv_id), CONVERSATION_TTL_SECONDS)
+        pipe.zadd(_index_key(user_id), {conv_id: timestamp_score(meta["updated_at"])})
+        pipe.expire(_index_key(user_id), CONVERSATION_TTL_SECONDS)
+        await pipe.execute()
+
+
+async def get_metadata(user_id: str, conv_id: str) -> Optional[dict[str, str]]:
+    """Return the conversation's metadata hash, or None if it does not exist."""
+    meta = await _redis.hgetall(_meta_key(user_id, conv_id))
+    return meta or None
+
+
+async def list_conversations(
+    user_id: str, limit: int, before: Optional[float] = None
+) -> list[tuple[str, dict[str, str]]]:
+    """Return up to `limit` (conv_id, metadata) pairs, most recently updated first.
+
+    `before` is an exclusive updated_at score for keyset pagination.
+    """
+    max_score = f"({before}" if before is not None else "+inf"
+    conv_ids = await _redis.zrevrangebyscore(
+        _index_key(user_id), max_score, "-inf", start=0, num=limit
+    )
+    if not conv_ids:
+        return []
+
+    async with _redis.pipeline(transaction=False) as pipe:
+        for conv_id in conv_ids:
+            pipe.hgetall(_meta_key(user_id, conv_id))
+        metas = await pipe.execute()
+
+    # Metadata expired, or a partial hash left by a write that raced a delete
+    stale = [conv_id for conv_id, meta in zip(conv_ids, metas) if "created_at" not in meta]
+    if stale:
+        await _redis.zrem(_index_key(user_id), *stale)
+        await _redis.delete(*(_meta_key(user_id, conv_id) for conv_id in stale))
+    return [(conv_id, meta) for conv_id, meta in zip(conv_ids, metas) if "created_at" in meta]
+
+
+async def append_message(
+    user_id: str, conv_id: str, message_json: str, meta_updates: dict[str, str]
+) -> bool:
+    """Append a message, cap the history length and refresh the conversation TTL.
+
+    Returns False without writing if the conversation no longer exists.
+    """
+    args: list = [
+        message_json,
+        MAX_MESSAGES_PER_CONVERSATION,
+        CONVERSATION_TTL_SECONDS,
+        timestamp_score(meta_updates["updated_at"]),
+        conv_id,
+    ]
+    for field, value in meta_updates.items():
+        args.extend((field, value))
+    appended = await _append_script(
+        keys=[_messages_key(user_id, conv_id), _meta_key(user_id, conv_id), _index_key(user_id)],
+        args=args,
+    )
+    return bool(appended)
+
+
+async def get_messages(user_id: str, conv_id: str, last: Optional[int] = None) -> list[str]:
+    """Return JSON-encoded messages oldest first, optionally only the last N."""
+    start = -last if last else 0
+    return await _redis.lrange(_messages_key(user_id, conv_id), start, -1)
+
+
+async def clear_messages(user_id: str, conv_id: str, updated_at: str) -> bool:
+    """Remove all messages. Returns False if the conversation no longer exists."""
+    cleared = await _clear_script(
+        keys=[_messages_key(user_id, conv_id), _meta_key(user_id, conv_id), _index_key(user_id)],
+        args=[updated_at, timestamp_score(updated_at), conv_id],
+    )
+    return bool(cleared)
+
+
+async def delete_conversation(user_id: str, conv_id: str) -> None:
+    async with _redis.pipeline(transaction=True) as pipe:
+        pipe.delete(_messages_key(user_id, conv_id), _meta_key(user_id, conv_id))
+        pipe.zrem(_index_key(user_id), conv_id)
+        await pipe.execute()
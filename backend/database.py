@@ -1,47 +1,114 @@
-import psycopg2
-from psycopg2.extras import RealDictCursor
+import asyncio
 import os
+
+import asyncpg
+from cachetools import TTLCache
 from dotenv import load_dotenv
 
+from backend.db_pool import conn
+from backend.embeddings import embed_text, to_pgvector
+
 load_dotenv()
 
-DATABASE_URL = os.getenv("DATABASE_URL")
+# Cosine distance above which an FAQ is considered unrelated to the query
+FAQ_MAX_DISTANCE = float(os.getenv("FAQ_MAX_DISTANCE", "0.6"))
+FAQ_CACHE_TTL_SECONDS = int(os.getenv("FAQ_CACHE_TTL_SECONDS", "300"))
+
+# (normalized query, limit) -> FAQ rows. Only touched from the event loop, so no lock is needed.
+_faq_cache: TTLCache = TTLCache(maxsize=2048, ttl=FAQ_CACHE_TTL_SECONDS)
+
+# Conversational filler that never matches an FAQ; these turns skip retrieval entirely
+GREETINGS = frozenset({
+    "hi", "hello", "hey", "yo", "ok", "okay", "k", "yes", "no", "yep", "nope", "sure",
+    "thanks", "thank you", "thx", "ty", "cool", "great", "bye", "goodbye",
+    "good morning", "good afternoon", "good evening",
+})
+MIN_RAG_QUERY_LENGTH = 3
+
+def _normalize_query(query: str) -> str:
+    return " ".join(query.lower().split())
+
+def _is_trivial_query(normalized: str) -> bool:
+    stripped = normalized.strip("!?.,;: ")
+    return len(stripped) < MIN_RAG_QUERY_LENGTH or stripped in GREETINGS
+
+# Hot queries are kept as constants so each pooled connection prepares them once
+# and reuses the cached statement (see DB_STATEMENT_CACHE_SIZE in db_pool.py).
+
+# Nearest neighbours over the HNSW-indexed embedding column (see migrations/002_faqs_embedding.sql)
+_SEMANTIC_SEARCH_SQL = """
+    SELECT id, category, question, answer
+    FROM (
+        SELECT id, category, question, answer, embedding <=> $1::text::vector AS distance
+        FROM faqs
+        WHERE embedding IS NOT NULL
+        ORDER BY distance
+        LIMIT $2
+    ) nearest
+    WHERE distance <= $3
+"""
+
+# Full-text search over the GIN-indexed tsv column (see migrations/001_faqs_fulltext.sql)
+_FULLTEXT_SEARCH_SQL = """
+    SELECT id, category, question, answer
+    FROM faqs, plainto_tsquery('english', $1) q
+    WHERE tsv @@ q
+    ORDER BY ts_rank(tsv, q) DESC
+    LIMIT $2
+"""
+
+async def _semantic_search(c: asyncpg.Connection, query_vec: str, limit: int) -> list[asyncpg.Record]:
+    return await c.fetch(_SEMANTIC_SEARCH_SQL, query_vec, limit, FAQ_MAX_DISTANCE)
 
-def get_relevant_faqs(query: str, limit: int = 3) -> list[dict]:
+async def _fulltext_search(c: asyncpg.Connection, query: str, limit: int) -> list[asyncpg.Record]:
+    return await c.fetch(_FULLTEXT_SEARCH_SQL, query, limit)
+
+async def get_relevant_faqs(query: str, limit: int = 3) -> list[dict]:
     """Retrieve relevant FAQs from PostgreSQL based on user query."""
+    cache_key = (_normalize_query(query), limit)
+    cached = _faq_cache.get(cache_key)
+    if cached is not None:
+        return list(cached)
+
     try:
-        conn = psycopg2.connect(DATABASE_URL)
-        cur = conn.cursor(cursor_factory=RealDictCursor)
-        
-        # Simple keyword search - you can improve this with more advanced search
-        sql = """
-            SELECT id, category, question, answer 
-            FROM faqs 
-            WHERE question ILIKE %s OR answer ILIKE %s
-            LIMIT %s
-        """
-        search_term = f"%{query}%"
-        cur.execute(sql, (search_term, search_term, limit))
-        faqs = cur.fetchall()
-        
-        cur.close()
-        conn.close()
+        # Embed before borrowing a connection; the model runs on a worker thread
+        query_vec = to_pgvector(await asyncio.to_thread(embed_text, query))
+    except Exception as e:
+        print(f"Embedding error: {e}")
+        query_vec = None
+
+    try:
+        async with conn() as c:
+            faqs = None
+            if query_vec is not None:
+                try:
+                    faqs = await _semantic_search(c, query_vec, limit)
+                except asyncpg.PostgresError as e:
+                    # pgvector unavailable - fall back to keyword search
+                    print(f"Semantic search error: {e}")
+            # Also fall back when nothing is close enough or FAQs are not embedded yet
+            if not faqs:
+                faqs = await _fulltext_search(c, query, limit)
         
-        return [dict(faq) for faq in faqs]
+        result = [dict(faq) for faq in faqs]
+        _faq_cache[cache_key] = result
+        return list(result)
     except Exception as e:
         print(f"Database error: {e}")
         return []
 
-def augment_prompt_with_context(user_query: str, conversation_history: str) -> str:
+async def augment_prompt_with_context(user_query: str, conversation_history: str) -> str:
     """Add FAQ context to the prompt using RAG pattern."""
-    faqs = get_relevant_faqs(user_query)
+    if _is_trivial_query(_normalize_query(user_query)):
+        return conversation_history
+    
+    faqs = await get_relevant_faqs(user_query)
     
     if not faqs:
         return conversation_history
     
-    context = "Relevant information from the Opportunity Center:\n"
-    for faq in faqs:
-        context += f"- {faq['question']}: {faq['answer']}\n"
-    
-    augmented = f"{context}\n{conversation_history}"
-    return augmented
\ No newline at end of file
+    parts = ["Relevant information from the Opportunity Center:"]
+    parts.extend(f"- {faq['question']}: {faq['answer']}" for faq in faqs)
+    parts.append("")
+    parts.append(conversation_history)
+    return "\n".join(parts)
\ No newline at end of file
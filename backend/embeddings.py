@@ -0,0 +1,63 @@
+import asyncio
+import os
+import threading
+
+from dotenv import load_dotenv
+from fastembed import TextEmbedding
+
+from backend.db_pool import conn
+
+load_dotenv()
+
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+
+_model: TextEmbedding | None = None
+_model_lock = threading.Lock()
+
+
+def _get_model() -> TextEmbedding:
+    """Load the ONNX embedding model on first use."""
+    global _model
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                _model = TextEmbedding(model_name=EMBEDDING_MODEL)
+    return _model
+
+
+def embed_texts(texts: list[str]) -> list[list[float]]:
+    """Embed a batch of texts into dense vectors."""
+    return [vec.tolist() for vec in _get_model().embed(texts)]
+
+
+def embed_text(text: str) -> list[float]:
+    return embed_texts([text])[0]
+
+
+def to_pgvector(vec: list[float]) -> str:
+    """Format a vector as a pgvector literal, e.g. '[0.1,0.2]'."""
+    return "[" + ",".join(f"{x:.7g}" for x in vec) + "]"
+
+
+async def backfill_faq_embeddings(batch_size: int = 64) -> int:
+    """Compute embeddings for FAQs that do not have one yet. Returns rows updated."""
+    async with conn() as c:
+        rows = await c.fetch("SELECT id, question, answer FROM faqs WHERE embedding IS NULL")
+
+    # Embed without holding a pooled connection; borrow one only for each batch update
+    for start in range(0, len(rows), batch_size):
+        batch = rows[start:start + batch_size]
+        vectors = await asyncio.to_thread(
+            embed_texts, [f"{row['question']}\n{row['answer']}" for row in batch]
+        )
+        async with conn() as c:
+            await c.executemany(
+                "UPDATE faqs SET embedding = $1::text::vector WHERE id = $2",
+                [(to_pgvector(vec), row["id"]) for row, vec in zip(batch, vectors)],
+            )
+
+    return len(rows)
+
+
+if __name__ == "__main__":
+    print(f"Embedded {asyncio.run(backfill_faq_embeddings())} FAQs with {EMBEDDING_MODEL}")
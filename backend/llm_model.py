@@ -1,13 +1,121 @@
-import requests
+import hashlib
+import httpx
+import json
 import os
+from typing import AsyncIterator
 from dotenv import load_dotenv
 
 load_dotenv()
 
 OLLAMA_API_URL = os.getenv("OLLAMA_API_URL", "http://localhost:11434")
-OLLAMA_MODEL = os.getenv("OLLAMA_MODEL", "tinyllama")
+# 4-bit quantized build: decode is memory-bandwidth bound, so smaller weights mean more tokens/s
+OLLAMA_MODEL = os.getenv("OLLAMA_MODEL", "tinyllama:1.1b-chat-v1-q4_K_M")
+# How long Ollama keeps the model resident after a request, avoiding cold loads when idle
+OLLAMA_KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "24h")
+# "ollama" for Ollama's /api/generate, "openai" for an OpenAI-compatible server
+# such as vLLM (/v1/completions), which batches concurrent requests continuously
+LLM_PROVIDER = os.getenv("LLM_PROVIDER", "ollama").lower()
+# Number of llama.cpp server slots (--parallel). When set, each conversation is pinned
+# to one slot so its KV cache from the previous turn is reused; 0 leaves slots unpinned.
+LLM_CACHE_SLOTS = int(os.getenv("LLM_CACHE_SLOTS", "0"))
 
-def generate_text(
+# Shared client so connections to the LLM server are kept alive and reused across requests
+_client = httpx.AsyncClient(
+    timeout=30,
+    limits=httpx.Limits(
+        max_connections=64,
+        max_keepalive_connections=16,
+        keepalive_expiry=60,
+    ),
+)
+
+async def close_client() -> None:
+    await _client.aclose()
+
+async def preload_model() -> None:
+    """Ask Ollama to load the model now so the first chat does not pay the load time."""
+    if LLM_PROVIDER != "ollama":
+        return
+    try:
+        response = await _client.post(
+            f"{OLLAMA_API_URL}/api/generate",
+            json={"model": OLLAMA_MODEL, "keep_alive": OLLAMA_KEEP_ALIVE},
+            timeout=120,
+        )
+        response.raise_for_status()
+    except httpx.HTTPError as e:
+        print(f"Ollama preload error: {e}")
+
+_SYSTEM_INSTRUCTION = (
+    "You are a helpful, knowledgeable AI assistant for the Opportunity Center. "
+    "Answer the following question clearly and concisely."
+)
+_QUESTION_PREFIX = _SYSTEM_INSTRUCTION + "\n\nQuestion:\n"
+
+def _full_prompt(prompt: str, wrap_prompt: bool) -> str:
+    if wrap_prompt:
+        full_prompt = _QUESTION_PREFIX + prompt.strip() + "\n\nAnswer:"
+    else:
+        full_prompt = prompt.strip()
+    return full_prompt
+
+def _generate_request(
+    full_prompt: str,
+    max_new_tokens: int,
+    temperature: float,
+    top_p: float,
+    stream: bool,
+    session_id: str | None = None,
+) -> tuple[str, dict]:
+    """Return the endpoint URL and JSON body for the configured LLM provider."""
+    if LLM_PROVIDER == "openai":
+        body = {
+            "model": OLLAMA_MODEL,
+            "prompt": full_prompt,
+            "stream": stream,
+            "max_tokens": max_new_tokens,
+            "temperature": temperature,
+            "top_p": top_p,
+            # llama.cpp server: keep the prompt's KV cache for the next request.
+            # vLLM reuses shared prefixes itself when started with --enable-prefix-caching.
+            "cache_prompt": True,
+        }
+        if session_id and LLM_CACHE_SLOTS > 0:
+            digest = hashlib.blake2b(session_id.encode(), digest_size=8).digest()
+            body["id_slot"] = int.from_bytes(digest, "big") % LLM_CACHE_SLOTS
+        return f"{OLLAMA_API_URL}/v1/completions", body
+    return f"{OLLAMA_API_URL}/api/generate", {
+        "model": OLLAMA_MODEL,
+        "prompt": full_prompt,
+        "stream": stream,
+        "keep_alive": OLLAMA_KEEP_ALIVE,
+        # Ollama reads sampling settings from "options", not the top level
+        "options": {
+            "num_predict": max_new_tokens,
+            "temperature": temperature,
+            "top_p": top_p,
+        },
+    }
+
+def _response_text(result: dict) -> str:
+    if LLM_PROVIDER == "openai":
+        choices = result.get("choices") or [{}]
+        return choices[0].get("text") or ""
+    return result.get("response") or ""
+
+def clean_reply(reply_text: str, strip_after: str | None = None, wrap_prompt: bool = True) -> str:
+    """Trim the reply and drop anything up to an echoed marker such as "Answer:"."""
+    reply_text = reply_text.strip()
+    
+    # Strip after marker if provided
+    if strip_after and strip_after in reply_text:
+        reply_text = reply_text.split(strip_after, 1)[1].strip()
+    elif wrap_prompt and "Answer:" in reply_text:
+        reply_text = reply_text.split("Answer:", 1)[1].strip()
+    
+    return reply_text
+
+async def generate_text(
     prompt: str,
     max_new_tokens: int = 80,
     temperature: float = 0.2,
@@ -15,48 +123,77 @@ def generate_text(
     do_sample: bool = False,
     wrap_prompt: bool = True,
     strip_after: str | None = None,
+    session_id: str | None = None,
 ) -> str:
-    """Generate text using Ollama API instead of local transformers."""
+    """Generate text using the Ollama (or OpenAI-compatible) API instead of local transformers."""
     
     if not prompt:
         raise ValueError("Prompt must not be empty.")
     
-    if wrap_prompt:
-        system_instruction = (
-            "You are a helpful, knowledgeable AI assistant for the Opportunity Center. "
-            "Answer the following question clearly and concisely."
-        )
-        full_prompt = (
-            system_instruction
-            + "\n\nQuestion:\n"
-            + prompt.strip()
-            + "\n\nAnswer:"
-        )
-    else:
-        full_prompt = prompt.strip()
+    full_prompt = _full_prompt(prompt, wrap_prompt)
+    
+    url, body = _generate_request(
+        full_prompt, max_new_tokens, temperature, top_p, stream=False, session_id=session_id
+    )
     
     try:
-        response = requests.post(
-            f"{OLLAMA_API_URL}/api/generate",
-            json={
-                "model": OLLAMA_MODEL,
-                "prompt": full_prompt,
-                "stream": False,
-                "temperature": temperature,
-                "top_p": top_p,
-            },
-            timeout=30,
-        )
+        response = await _client.post(url, json=body)
         response.raise_for_status()
         result = response.json()
-        reply_text = result.get("response", "").strip()
-        
-        # Strip after marker if provided
-        if strip_after and strip_after in reply_text:
-            reply_text = reply_text.split(strip_after, 1)[1].strip()
-        elif wrap_prompt and "Answer:" in reply_text:
-            reply_text = reply_text.split("Answer:", 1)[1].strip()
-        
-        return reply_text
-    except requests.exceptions.RequestException as e:
-        raise Exception(f"Ollama API error: {str(e)}")
\ No newline at end of file
+        return clean_reply(_response_text(result), strip_after, wrap_prompt)
+    except httpx.HTTPError as e:
+        raise Exception(f"LLM API error: {str(e)}")
+    except (ValueError, KeyError, IndexError) as e:
+        # Malformed body from the LLM server; a plain ValueError would surface as a 400
+        raise Exception(f"LLM API error: invalid response: {str(e)}")
+
+async def generate_text_stream(
+    prompt: str,
+    max_new_tokens: int = 80,
+    temperature: float = 0.2,
+    top_p: float = 0.8,
+    wrap_prompt: bool = True,
+    session_id: str | None = None,
+) -> AsyncIterator[str]:
+    """Yield response fragments from the LLM server as they are generated.
+
+    Unlike generate_text, no strip_after post-processing is applied since the
+    text is forwarded before the full reply is known; run clean_reply on the
+    assembled text.
+    """
+    
+    if not prompt:
+        raise ValueError("Prompt must not be empty.")
+    
+    url, body = _generate_request(
+        _full_prompt(prompt, wrap_prompt),
+        max_new_tokens,
+        temperature,
+        top_p,
+        stream=True,
+        session_id=session_id,
+    )
+    
+    try:
+        async with _client.stream("POST", url, json=body) as response:
+            response.raise_for_status()
+            # Ollama streams one JSON object per line; OpenAI-compatible servers use SSE "data:" lines
+            async for line in response.aiter_lines():
+                if LLM_PROVIDER == "openai":
+                    if not line.startswith("data:"):
+                        continue
+                    line = line[5:].strip()
+                    if line == "[DONE]":
+                        break
+                if not line:
+                    continue
+                chunk = json.loads(line)
+                text = _response_text(chunk)
+                if text:
+                    yield text
+                if chunk.get("done"):
+                    break
+    except httpx.HTTPError as e:
+        raise Exception(f"LLM API error: {str(e)}")
+    except (ValueError, KeyError, IndexError) as e:
+        raise Exception(f"LLM API error: invalid response: {str(e)}")
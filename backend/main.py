@@ -1,19 +1,71 @@
 from __future__ import annotations
 
+import asyncio
+import hashlib
+import os
+from contextlib import asynccontextmanager
 from datetime import datetime
 from typing import List, Literal, Optional
 from uuid import uuid4
 
-from fastapi import FastAPI, HTTPException, Request
+import orjson
+from fastapi import BackgroundTasks, FastAPI, HTTPException, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from pydantic import BaseModel
 
-from backend.llm_model import generate_text
+from backend.llm_model import (
+    clean_reply,
+    close_client,
+    generate_text,
+    generate_text_stream,
+    preload_model,
+)
 from backend.database import augment_prompt_with_context
-from backend.auth import create_access_token, verify_token, register_user, authenticate_user
+from backend.auth import (
+    create_access_token,
+    create_refresh_token,
+    verify_token,
+    register_user,
+    authenticate_user,
+)
+from backend.db_pool import close_pool
+from backend.embeddings import backfill_faq_embeddings
+from backend import conversation_store
 
 
-app = FastAPI(title="Opportunity Center Chat Backend", version="1.0.0")
+async def _backfill_embeddings_on_startup() -> None:
+    # Embed FAQs added since the last start so semantic search can find them
+    try:
+        count = await backfill_faq_embeddings()
+        if count:
+            print(f"Embedded {count} new FAQs")
+    except Exception as e:
+        print(f"FAQ embedding backfill error: {e}")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await preload_model()
+    # With several workers each would load the embedding model and embed the same rows;
+    # run `python -m backend.embeddings` once instead
+    backfill_task = None
+    if int(os.getenv("WEB_CONCURRENCY", "1")) <= 1:
+        backfill_task = asyncio.create_task(_backfill_embeddings_on_startup())
+    yield
+    if backfill_task:
+        backfill_task.cancel()
+    await close_client()
+    await close_pool()
+    await conversation_store.close_store()
+
+
+app = FastAPI(
+    title="Opportunity Center Chat Backend",
+    version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse,
+)
 
 # Configure CORS
 app.add_middleware(
@@ -67,10 +119,26 @@ class RegisterRequest(BaseModel):
     password: str
 
 
-# --- Chat Data Storage ---
+class RefreshRequest(BaseModel):
+    refreshToken: str
+
 
-conversation_messages: dict[str, dict[str, list[ChatMessage]]] = {}
-conversation_metadata: dict[str, dict[str, dict[str, datetime | str]]] = {}
+# --- Prompting ---
+
+_SYSTEM_PROMPT = (
+    "You are a helpful assistant for the Opportunity Center. "
+    "Provide a single concise answer to the most recent user question. "
+    "Do not invent or ask questions. Reply with only the answer text, no prefixes or labels. "
+    "Keep replies under 80 words."
+)
+_SYSTEM_PROMPT_PREFIX = _SYSTEM_PROMPT + "\n\n"
+
+# The history window always starts on a multiple of _HISTORY_BLOCK_SIZE, counted over the
+# whole conversation, and keeps at least _HISTORY_MIN_MESSAGES. Old turns are dropped a
+# block at a time, so the history prefix stays the same between drops and the LLM server
+# can reuse its cached prefill for it.
+_HISTORY_MIN_MESSAGES = 10
+_HISTORY_BLOCK_SIZE = 8
 
 
 # --- Helper Functions ---
@@ -82,12 +150,18 @@ def _get_user_id(request: Request) -> str:
     return user_id
 
 
-def _get_user_message_store(user_id: str) -> dict[str, list[ChatMessage]]:
-    return conversation_messages.setdefault(user_id, {})
+async def _get_messages(
+    user_id: str, conversation_id: str, last: Optional[int] = None
+) -> list[ChatMessage]:
+    raw = await conversation_store.get_messages(user_id, conversation_id, last)
+    return [ChatMessage.model_validate_json(item) for item in raw]
 
 
-def _get_user_metadata_store(user_id: str) -> dict[str, dict[str, datetime | str]]:
-    return conversation_metadata.setdefault(user_id, {})
+async def _require_metadata(user_id: str, conversation_id: str) -> dict[str, str]:
+    meta = await conversation_store.get_metadata(user_id, conversation_id)
+    if meta is None:
+        raise HTTPException(status_code=404, detail="Conversation not found.")
+    return meta
 
 
 def _derive_title(text: str) -> str:
@@ -97,117 +171,140 @@ def _derive_title(text: str) -> str:
     return cleaned[:60] + ("..." if len(cleaned) > 60 else "")
 
 
-def _create_conversation(user_id: str, first_user_message: str) -> str:
-    user_meta = _get_user_metadata_store(user_id)
-    user_messages = _get_user_message_store(user_id)
+async def _create_conversation(user_id: str, first_user_message: str) -> str:
     conv_id = str(uuid4())
-    now = datetime.utcnow()
-    user_meta[conv_id] = {
-        "title": _derive_title(first_user_message),
-        "created_at": now,
-        "updated_at": now,
-    }
-    user_messages[conv_id] = []
+    now = datetime.utcnow().isoformat()
+    await conversation_store.create_conversation(
+        user_id,
+        conv_id,
+        {
+            "title": _derive_title(first_user_message),
+            "created_at": now,
+            "updated_at": now,
+        },
+    )
     return conv_id
 
 
-def _ensure_conversation(
+async def _ensure_conversation(
     user_id: str, conversation_id: Optional[str], user_message: str
 ) -> str:
-    user_meta = _get_user_metadata_store(user_id)
-    if conversation_id and conversation_id in user_meta:
+    if conversation_id and await conversation_store.get_metadata(user_id, conversation_id):
         return conversation_id
-    return _create_conversation(user_id, user_message)
+    return await _create_conversation(user_id, user_message)
 
 
-def _store_message(
-    user_id: str, conversation_id: str, role: Literal["user", "assistant"], content: str
+def _new_message(
+    conversation_id: str, role: Literal["user", "assistant"], content: str
 ) -> ChatMessage:
-    user_messages = _get_user_message_store(user_id)
-    user_meta = _get_user_metadata_store(user_id)
-
-    if conversation_id not in user_messages:
-        raise HTTPException(status_code=404, detail="Conversation not found.")
-
-    message = ChatMessage(
+    return ChatMessage(
         id=str(uuid4()),
         content=content,
         role=role,
         timestamp=datetime.utcnow().isoformat(),
         conversationId=conversation_id,
     )
-    user_messages[conversation_id].append(message)
 
-    meta = user_meta[conversation_id]
-    meta["updated_at"] = datetime.utcnow()
-    if role == "user" and (not meta.get("title") or meta["title"] == "New Conversation"):
-        meta["title"] = _derive_title(content)
 
+async def _persist_message(user_id: str, message: ChatMessage) -> None:
+    meta = await _require_metadata(user_id, message.conversationId)
+
+    meta_updates = {"updated_at": datetime.utcnow().isoformat()}
+    if message.role == "user" and (not meta.get("title") or meta["title"] == "New Conversation"):
+        meta_updates["title"] = _derive_title(message.content)
+
+    appended = await conversation_store.append_message(
+        user_id, message.conversationId, message.model_dump_json(), meta_updates
+    )
+    if not appended:
+        # Deleted between the metadata check and the write
+        raise HTTPException(status_code=404, detail="Conversation not found.")
+
+
+async def _persist_message_in_background(user_id: str, message: ChatMessage) -> None:
+    # The response has already been sent, so errors can only be logged here
+    try:
+        await _persist_message(user_id, message)
+    except HTTPException as e:
+        print(f"Persist error: {e.detail}")
+    except Exception as e:
+        print(f"Persist error: {e}")
+
+
+async def _store_message(
+    user_id: str, conversation_id: str, role: Literal["user", "assistant"], content: str
+) -> ChatMessage:
+    message = _new_message(conversation_id, role, content)
+    await _persist_message(user_id, message)
     return message
 
 
-def _build_prompt(user_id: str, conversation_id: str) -> str:
-    history = _get_user_message_store(user_id).get(conversation_id, [])
-    recent_history = history[-10:]
+def _history_window(message_count: int) -> int:
+    """Return how many of the latest messages to include in the prompt."""
+    if message_count <= _HISTORY_MIN_MESSAGES:
+        return message_count
+    start = (message_count - _HISTORY_MIN_MESSAGES) // _HISTORY_BLOCK_SIZE * _HISTORY_BLOCK_SIZE
+    return message_count - start
+
+
+async def _build_prompt(user_id: str, conversation_id: str) -> str:
+    # message_count counts every message ever sent, unlike the capped list, so block
+    # boundaries don't shift once the stored history starts being trimmed
+    meta = await _require_metadata(user_id, conversation_id)
+    window = _history_window(int(meta.get("message_count", 0)))
+    recent_history = await _get_messages(user_id, conversation_id, last=window) if window else []
 
     latest_user = next(
         (msg for msg in reversed(recent_history) if msg.role == "user"), None
     )
 
-    history_lines = []
-    for msg in recent_history:
-        role = "User" if msg.role == "user" else "Assistant"
-        history_lines.append(f"{role}: {msg.content}")
-    history_block = "\n".join(history_lines)
+    history_block = "\n".join(
+        f"{'User' if msg.role == 'user' else 'Assistant'}: {msg.content}"
+        for msg in recent_history
+    )
 
     if not latest_user:
         latest_content = ""
     else:
         latest_content = latest_user.content
 
-    system = (
-        "You are a helpful assistant for the Opportunity Center. "
-        "Provide a single concise answer to the most recent user question. "
-        "Do not invent or ask questions. Reply with only the answer text, no prefixes or labels. "
-        "Keep replies under 80 words."
-    )
-
-    conversation_context = (
-        f"Recent conversation:\n{history_block}\n\n"
+    question_block = (
         f"Answer the latest user question once. Do not add new questions.\n"
         f"Latest question: {latest_content}\n"
         f"Answer:"
     )
     
-    # Apply RAG - augment prompt with relevant FAQ context
-    augmented_context = augment_prompt_with_context(latest_content, conversation_context)
-
-    return f"{system}\n\n{augmented_context}"
+    # Apply RAG - augment prompt with relevant FAQ context. The per-turn FAQ block goes
+    # after the history so the system prompt + history prefix stays stable between turns
+    # and the LLM server can reuse its cached prefill for it.
+    augmented_question = await augment_prompt_with_context(latest_content, question_block)
+
+    return (
+        _SYSTEM_PROMPT_PREFIX
+        + f"Recent conversation:\n{history_block}\n\n"
+        + augmented_question
+    )
 
 
-def _conversation_summary(user_id: str, conversation_id: str) -> ConversationSummary:
-    user_meta = _get_user_metadata_store(user_id)
-    user_messages = _get_user_message_store(user_id)
+def _issue_tokens(email: str) -> dict:
+    return {
+        "token": create_access_token({"sub": email}),
+        "refreshToken": create_refresh_token({"sub": email}),
+        "email": email,
+    }
 
-    if conversation_id not in user_meta:
-        raise HTTPException(status_code=404, detail="Conversation not found.")
 
-    meta = user_meta[conversation_id]
-    messages = user_messages.get(conversation_id, [])
+def _sse_event(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {orjson.dumps(data).decode()}\n\n"
 
-    title = meta.get("title", "New Conversation")
-    if (not title or title == "New Conversation") and messages:
-        for msg in messages:
-            if msg.role == "user":
-                title = _derive_title(msg.content)
-                break
 
+def _conversation_summary(conversation_id: str, meta: dict[str, str]) -> ConversationSummary:
     return ConversationSummary(
         id=conversation_id,
-        title=title or "Conversation",
-        createdAt=meta["created_at"].isoformat(),
-        updatedAt=meta["updated_at"].isoformat(),
-        messageCount=len(messages),
+        title=meta.get("title") or "Conversation",
+        createdAt=meta["created_at"],
+        updatedAt=meta["updated_at"],
+        messageCount=int(meta.get("message_count", 0)),
     )
 
 
@@ -221,27 +318,34 @@ async def root():
 # --- Authentication Endpoints ---
 
 @app.post("/api/auth/register")
-def register(req: RegisterRequest):
-    result = register_user(req.email, req.password)
+async def register(req: RegisterRequest):
+    result = await register_user(req.email, req.password)
     if "error" in result:
         raise HTTPException(status_code=400, detail=result["error"])
     
-    token = create_access_token({"sub": req.email})
-    return {"token": token, "email": req.email}
+    return _issue_tokens(req.email)
 
 
 @app.post("/api/auth/login")
-def login(req: LoginRequest):
-    user = authenticate_user(req.email, req.password)
+async def login(req: LoginRequest):
+    user = await authenticate_user(req.email, req.password)
     if not user:
         raise HTTPException(status_code=401, detail="Invalid credentials")
     
-    token = create_access_token({"sub": req.email})
-    return {"token": token, "email": req.email}
+    return _issue_tokens(req.email)
+
+
+@app.post("/api/auth/refresh")
+async def refresh(req: RefreshRequest):
+    email = verify_token(req.refreshToken, token_type="refresh")
+    if not email:
+        raise HTTPException(status_code=401, detail="Invalid refresh token")
+    
+    return _issue_tokens(email)
 
 
 @app.get("/api/auth/me")
-def get_me(request: Request):
+async def get_me(request: Request):
     auth_header = request.headers.get("Authorization")
     if not auth_header:
         raise HTTPException(status_code=401, detail="No authorization header")
@@ -259,45 +363,63 @@ def get_me(request: Request):
 # --- Chat Endpoints ---
 
 @app.get("/api/chat/conversations", response_model=List[ConversationSummary])
-def list_conversations(request: Request):
+async def list_conversations(
+    request: Request,
+    limit: int = Query(50, ge=1, le=200),
+    before: Optional[str] = Query(None, description="updatedAt of the last conversation on the previous page"),
+):
     user_id = _get_user_id(request)
-    user_meta = _get_user_metadata_store(user_id)
 
-    summaries = [_conversation_summary(user_id, conv_id) for conv_id in user_meta]
-    summaries.sort(key=lambda s: s.updatedAt, reverse=True)
-    return summaries
+    before_score = None
+    if before:
+        try:
+            before_score = conversation_store.timestamp_score(before)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid 'before' cursor.")
+
+    conversations = await conversation_store.list_conversations(user_id, limit, before_score)
+    return [_conversation_summary(conv_id, meta) for conv_id, meta in conversations]
 
 
 @app.get("/api/chat/conversations/{conversation_id}", response_model=ChatHistoryResponse)
-def get_conversation(conversation_id: str, request: Request):
+async def get_conversation(conversation_id: str, request: Request, response: Response):
     user_id = _get_user_id(request)
-    user_messages = _get_user_message_store(user_id)
+    meta = await _require_metadata(user_id, conversation_id)
 
-    if conversation_id not in user_messages:
-        raise HTTPException(status_code=404, detail="Conversation not found.")
+    # Metadata changes on every write, so it identifies the history without reading it
+    etag_source = f"{meta['updated_at']}-{meta.get('message_count', 0)}"
+    etag = '"' + hashlib.blake2b(etag_source.encode(), digest_size=8).hexdigest() + '"'
+    cache_headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+
+    if_none_match = request.headers.get("if-none-match", "")
+    if etag in (tag.strip().removeprefix("W/") for tag in if_none_match.split(",")):
+        return Response(status_code=304, headers=cache_headers)
+    response.headers.update(cache_headers)
 
     return ChatHistoryResponse(
-        messages=user_messages[conversation_id],
+        messages=await _get_messages(user_id, conversation_id),
         conversationId=conversation_id,
     )
 
 
 @app.post("/api/chat/message", response_model=SendMessageResponse)
-def chat_with_llm(req: SendMessageRequest, request: Request):
+async def chat_with_llm(
+    req: SendMessageRequest, request: Request, background_tasks: BackgroundTasks
+):
     user_id = _get_user_id(request)
     message_text = req.message.strip()
     if not message_text:
         raise HTTPException(status_code=400, detail="Message must not be empty.")
 
-    conversation_id = _ensure_conversation(user_id, req.conversationId, message_text)
+    conversation_id = await _ensure_conversation(user_id, req.conversationId, message_text)
 
     # Add the user message to history before calling the model
-    _store_message(user_id, conversation_id, "user", message_text)
+    await _store_message(user_id, conversation_id, "user", message_text)
 
-    prompt = _build_prompt(user_id, conversation_id)
+    prompt = await _build_prompt(user_id, conversation_id)
 
     try:
-        reply_text = generate_text(
+        reply_text = await generate_text(
             prompt=prompt,
             max_new_tokens=80,
             temperature=0.2,
@@ -305,13 +427,17 @@ def chat_with_llm(req: SendMessageRequest, request: Request):
             do_sample=False,
             wrap_prompt=False,
             strip_after="Answer:",
+            session_id=conversation_id,
         )
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"LLM generation failed: {str(e)}")
 
-    assistant_message = _store_message(user_id, conversation_id, "assistant", reply_text)
+    # Persist after the response is sent; the client only needs the reply body. A client
+    # that sends its next message immediately may get that user turn stored before this reply.
+    assistant_message = _new_message(conversation_id, "assistant", reply_text)
+    background_tasks.add_task(_persist_message_in_background, user_id, assistant_message)
 
     return SendMessageResponse(
         message=assistant_message,
@@ -319,33 +445,102 @@ def chat_with_llm(req: SendMessageRequest, request: Request):
     )
 
 
-@app.delete("/api/chat/conversations/{conversation_id}")
-def delete_conversation(conversation_id: str, request: Request):
+@app.post("/api/chat/message/stream")
+async def stream_chat_with_llm(req: SendMessageRequest, request: Request):
     user_id = _get_user_id(request)
-    user_meta = _get_user_metadata_store(user_id)
+    message_text = req.message.strip()
+    if not message_text:
+        raise HTTPException(status_code=400, detail="Message must not be empty.")
+
+    conversation_id = await _ensure_conversation(user_id, req.conversationId, message_text)
+    await _store_message(user_id, conversation_id, "user", message_text)
+    prompt = await _build_prompt(user_id, conversation_id)
+
+    async def event_stream():
+        # Events: meta (conversation id), token (reply fragment), done (stored reply) or error
+        yield _sse_event("meta", {"conversationId": conversation_id})
+
+        reply_parts: list[str] = []
+        try:
+            async for token in generate_text_stream(
+                prompt=prompt,
+                temperature=0.2,
+                top_p=0.8,
+                wrap_prompt=False,
+                session_id=conversation_id,
+            ):
+                reply_parts.append(token)
+                yield _sse_event("token", {"token": token})
+        except Exception as e:
+            yield _sse_event("error", {"detail": f"LLM generation failed: {str(e)}"})
+            return
+
+        # Store before the final event so a history reload after "done" sees the reply
+        # Same post-processing as /api/chat/message, e.g. dropping an echoed "Answer:"
+        reply_text = clean_reply("".join(reply_parts), strip_after="Answer:", wrap_prompt=False)
+        try:
+            assistant_message = await _store_message(
+                user_id, conversation_id, "assistant", reply_text
+            )
+        except HTTPException as e:
+            yield _sse_event("error", {"detail": e.detail})
+            return
+        except Exception as e:
+            yield _sse_event("error", {"detail": f"Failed to store reply: {str(e)}"})
+            return
+        yield _sse_event("done", assistant_message.model_dump())
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
-    if conversation_id not in user_meta:
-        raise HTTPException(status_code=404, detail="Conversation not found.")
 
-    _get_user_message_store(user_id).pop(conversation_id, None)
-    user_meta.pop(conversation_id, None)
+@app.delete("/api/chat/conversations/{conversation_id}")
+async def delete_conversation(conversation_id: str, request: Request):
+    user_id = _get_user_id(request)
+    await _require_metadata(user_id, conversation_id)
+
+    await conversation_store.delete_conversation(user_id, conversation_id)
     return {"message": "Conversation deleted."}
 
 
 @app.delete("/api/chat/conversations/{conversation_id}/messages")
-def clear_conversation_messages(conversation_id: str, request: Request):
+async def clear_conversation_messages(conversation_id: str, request: Request):
     user_id = _get_user_id(request)
-    user_meta = _get_user_metadata_store(user_id)
-    user_messages = _get_user_message_store(user_id)
 
-    if conversation_id not in user_meta:
+    cleared = await conversation_store.clear_messages(
+        user_id, conversation_id, datetime.utcnow().isoformat()
+    )
+    if not cleared:
         raise HTTPException(status_code=404, detail="Conversation not found.")
-
-    user_messages[conversation_id] = []
-    user_meta[conversation_id]["updated_at"] = datetime.utcnow()
     return {"message": "Conversation messages cleared."}
 
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
+
+    # Conversation state lives in Redis, so requests can go to any worker process.
+    # JWTs only validate across workers if they share a configured signing key;
+    # without one each worker would generate its own ephemeral key.
+    has_signing_key = bool(os.getenv("JWT_PRIVATE_KEY") or os.getenv("JWT_PRIVATE_KEY_FILE"))
+    default_workers = (os.cpu_count() or 1) if has_signing_key else 1
+    workers = int(os.getenv("WEB_CONCURRENCY", default_workers))
+    if workers > 1 and not has_signing_key:
+        raise SystemExit(
+            "Refusing to start multiple workers without JWT_PRIVATE_KEY or JWT_PRIVATE_KEY_FILE."
+        )
+    # Workers inherit this, so they can size their DB pools and skip the startup backfill
+    os.environ["WEB_CONCURRENCY"] = str(workers)
+
+    limit_concurrency = os.getenv("UVICORN_LIMIT_CONCURRENCY")
+    uvicorn.run(
+        "backend.main:app",
+        host="0.0.0.0",
+        port=8000,
+        workers=workers,
+        loop="uvloop",
+        http="httptools",
+        limit_concurrency=int(limit_concurrency) if limit_concurrency else None,
+    )
\ No newline at end of file
@@ -0,0 +1,10 @@
+-- Full-text search for FAQ retrieval (backend/database.py:get_relevant_faqs).
+-- Apply with: psql "$DATABASE_URL" -f backend/migrations/001_faqs_fulltext.sql
+
+ALTER TABLE faqs
+    ADD COLUMN IF NOT EXISTS tsv tsvector
+    GENERATED ALWAYS AS (
+        to_tsvector('english', coalesce(question, '') || ' ' || coalesce(answer, ''))
+    ) STORED;
+
+CREATE INDEX IF NOT EXISTS faqs_tsv_idx ON faqs USING GIN (tsv);
@@ -0,0 +1,11 @@
+-- Semantic FAQ retrieval with pgvector (backend/database.py:get_relevant_faqs).
+-- Apply with: psql "$DATABASE_URL" -f backend/migrations/002_faqs_embedding.sql
+-- The backend embeds FAQs with a NULL embedding when it starts; to embed newly
+-- added FAQs without a restart, run: python -m backend.embeddings
+
+CREATE EXTENSION IF NOT EXISTS vector;
+
+-- 384 dimensions matches sentence-transformers/all-MiniLM-L6-v2
+ALTER TABLE faqs ADD COLUMN IF NOT EXISTS embedding vector(384);
+
+CREATE INDEX IF NOT EXISTS faqs_embedding_idx ON faqs USING hnsw (embedding vector_cosine_ops);
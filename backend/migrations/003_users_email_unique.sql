@@ -0,0 +1,18 @@
+-- Unique emails, required by ON CONFLICT (email) in backend/auth.py:register_user.
+-- Apply with: psql "$DATABASE_URL" -f backend/migrations/003_users_email_unique.sql
+
+DO $$
+BEGIN
+    IF NOT EXISTS (
+        SELECT 1
+        FROM pg_index i
+        JOIN pg_attribute a ON a.attrelid = i.indrelid AND a.attnum = ANY (i.indkey)
+        WHERE i.indrelid = 'users'::regclass
+          AND i.indisunique
+          AND i.indnkeyatts = 1
+          AND a.attname = 'email'
+    ) THEN
+        ALTER TABLE users ADD CONSTRAINT users_email_key UNIQUE (email);
+    END IF;
+END
+$$;
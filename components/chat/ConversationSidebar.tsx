@@ -9,6 +9,8 @@ interface ConversationSidebarProps {
   onSelectConversation: (conversationId: string) => void;
   onNewConversation: () => void;
   onDeleteConversation: (conversationId: string) => void;
+  hasMore?: boolean;
+  onLoadMore?: () => void;
 }
 
 export function ConversationSidebar({
@@ -17,6 +19,8 @@ export function ConversationSidebar({
   onSelectConversation,
   onNewConversation,
   onDeleteConversation,
+  hasMore = false,
+  onLoadMore,
 }: ConversationSidebarProps) {
   return (
     <div className="w-64 bg-gray-50 dark:bg-gray-800 border-r border-gray-200 dark:border-gray-700 flex flex-col h-full">
@@ -81,6 +85,14 @@ export function ConversationSidebar({
                 </div>
               </div>
             ))}
+            {hasMore && onLoadMore && (
+              <button
+                onClick={onLoadMore}
+                className="w-full px-3 py-2 text-sm text-gray-600 dark:text-gray-400 hover:bg-gray-100 dark:hover:bg-gray-700 rounded-lg transition-colors"
+              >
+                Load more
+              </button>
+            )}
           </div>
         )}
       </div>
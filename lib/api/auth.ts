@@ -17,6 +17,7 @@ export interface RegisterData {
 
 export interface AuthResponse {
   token: string;
+  refreshToken?: string;
   user: User;
 }
 
@@ -32,18 +33,25 @@ export const authApi = {
   async login(credentials: LoginCredentials): Promise<AuthResponse> {
     const response = await apiClient.post<AuthResponse>('/auth/login', credentials);
     apiClient.setToken(response.token);
+    apiClient.setRefreshToken(response.refreshToken ?? null);
     return response;
   },
 
   async register(data: RegisterData): Promise<AuthResponse> {
     const response = await apiClient.post<AuthResponse>('/auth/register', data);
     apiClient.setToken(response.token);
+    apiClient.setRefreshToken(response.refreshToken ?? null);
     return response;
   },
 
   async logout(): Promise<void> {
-    await apiClient.post('/auth/logout');
-    apiClient.setToken(null);
+    try {
+      await apiClient.post('/auth/logout');
+    } finally {
+      // Clear tokens even if the request fails so the refresh token cannot log the user back in
+      apiClient.setToken(null);
+      apiClient.setRefreshToken(null);
+    }
   },
 
   async getCurrentUser(): Promise<User> {
@@ -51,8 +59,11 @@ export const authApi = {
   },
 
   async refreshToken(): Promise<AuthResponse> {
-    const response = await apiClient.post<AuthResponse>('/auth/refresh');
+    const response = await apiClient.post<AuthResponse>('/auth/refresh', {
+      refreshToken: apiClient.getRefreshToken(),
+    });
     apiClient.setToken(response.token);
+    apiClient.setRefreshToken(response.refreshToken ?? null);
     return response;
   },
 };
@@ -2,7 +2,7 @@
  * Chat API endpoints
  */
 
-import { apiClient } from './client';
+import { apiClient, ApiError } from './client';
 
 export interface Message {
   id: string;
@@ -35,13 +35,59 @@ export interface ChatHistoryResponse {
   conversationId: string;
 }
 
+export interface StreamMessageHandlers {
+  onConversation?: (conversationId: string) => void;
+  onToken?: (token: string) => void;
+}
+
+export const CONVERSATIONS_PAGE_SIZE = 50;
+
 export const chatApi = {
   async sendMessage(data: SendMessageRequest): Promise<SendMessageResponse> {
     return apiClient.post<SendMessageResponse>('/chat/message', data);
   },
 
-  async getConversations(): Promise<Conversation[]> {
-    return apiClient.get<Conversation[]>('/chat/conversations');
+  /**
+   * Send a message and receive the assistant reply token by token.
+   * Resolves with the stored assistant message once generation completes.
+   */
+  async streamMessage(
+    data: SendMessageRequest,
+    handlers: StreamMessageHandlers = {}
+  ): Promise<SendMessageResponse> {
+    let conversationId = data.conversationId ?? '';
+    let message: Message | undefined;
+    let error: string | undefined;
+
+    await apiClient.stream('/chat/message/stream', data, (event, payload) => {
+      if (event === 'meta') {
+        conversationId = payload.conversationId;
+        handlers.onConversation?.(conversationId);
+      } else if (event === 'token') {
+        handlers.onToken?.(payload.token);
+      } else if (event === 'done') {
+        message = payload as Message;
+      } else if (event === 'error') {
+        error = payload.detail;
+      }
+    });
+
+    if (error || !message) {
+      throw new ApiError(error || 'Stream ended unexpectedly', 500);
+    }
+    return { message, conversationId };
+  },
+
+  /**
+   * Fetch one page of conversations, most recently updated first.
+   * Pass the updatedAt of the last conversation already loaded as `before` for the next page.
+   */
+  async getConversations(before?: string, limit = CONVERSATIONS_PAGE_SIZE): Promise<Conversation[]> {
+    const params = new URLSearchParams({ limit: String(limit) });
+    if (before) {
+      params.set('before', before);
+    }
+    return apiClient.get<Conversation[]>(`/chat/conversations?${params}`);
   },
 
   async getConversationHistory(conversationId: string): Promise<ChatHistoryResponse> {
@@ -20,6 +20,8 @@ class ApiClient {
   private baseUrl: string;
   private defaultHeaders: HeadersInit;
   private userIdKey = 'auth_user_id';
+  private refreshTokenKey = 'auth_refresh_token';
+  private refreshing: Promise<boolean> | null = null;
 
   constructor() {
     this.baseUrl = API_BASE_URL;
@@ -28,15 +30,12 @@ class ApiClient {
     };
   }
 
-  private async request<T>(
-    endpoint: string,
-    options: RequestInit = {}
-  ): Promise<T> {
+  private buildHeaders(extra?: HeadersInit): HeadersInit {
     const token = this.getToken();
     const userId = this.getUserId();
     const headers: HeadersInit = {
       ...this.defaultHeaders,
-      ...options.headers,
+      ...extra,
     };
 
     if (token) {
@@ -45,15 +44,66 @@ class ApiClient {
     if (userId) {
       (headers as any)['X-User-Id'] = userId;
     }
+    return headers;
+  }
+
+  /**
+   * Exchange the stored refresh token for a new access token.
+   * Concurrent callers share a single in-flight refresh.
+   */
+  private refreshAccessToken(): Promise<boolean> {
+    if (!this.refreshing) {
+      this.refreshing = (async () => {
+        const refreshToken = this.getRefreshToken();
+        if (!refreshToken) return false;
+        try {
+          const response = await fetch(`${this.baseUrl}/auth/refresh`, {
+            method: 'POST',
+            headers: this.defaultHeaders,
+            body: JSON.stringify({ refreshToken }),
+          });
+          if (!response.ok) {
+            this.setRefreshToken(null);
+            return false;
+          }
+          const data = await response.json();
+          this.setToken(data.token);
+          this.setRefreshToken(data.refreshToken ?? refreshToken);
+          return true;
+        } catch {
+          return false;
+        } finally {
+          this.refreshing = null;
+        }
+      })();
+    }
+    return this.refreshing;
+  }
 
+  private async request<T>(
+    endpoint: string,
+    options: RequestInit = {},
+    retryOnUnauthorized = true
+  ): Promise<T> {
     const url = `${this.baseUrl}${endpoint}`;
     const config: RequestInit = {
       ...options,
-      headers,
+      headers: this.buildHeaders(options.headers),
     };
 
     try {
       const response = await fetch(url, config);
+
+      // Access tokens are short-lived; refresh once and retry
+      if (
+        response.status === 401 &&
+        retryOnUnauthorized &&
+        endpoint !== '/auth/refresh' &&
+        (await this.refreshAccessToken())
+      ) {
+        return this.request<T>(endpoint, options, false);
+      }
+
       const data = await response.json().catch(() => ({}));
 
       if (!response.ok) {
@@ -81,6 +131,19 @@ class ApiClient {
     return localStorage.getItem('auth_token');
   }
 
+  getRefreshToken(): string | null {
+    if (typeof window === 'undefined') return null;
+    return localStorage.getItem(this.refreshTokenKey);
+  }
+
+  setRefreshToken(token: string | null): void {
+    if (token) {
+      localStorage.setItem(this.refreshTokenKey, token);
+    } else {
+      localStorage.removeItem(this.refreshTokenKey);
+    }
+  }
+
   private getUserId(): string | null {
     if (typeof window === 'undefined') return null;
     return localStorage.getItem(this.userIdKey);
@@ -125,6 +188,65 @@ class ApiClient {
   async delete<T>(endpoint: string, options?: RequestInit): Promise<T> {
     return this.request<T>(endpoint, { ...options, method: 'DELETE' });
   }
+
+  /**
+   * POST and read a text/event-stream response, invoking onEvent per SSE frame
+   */
+  async stream(
+    endpoint: string,
+    data: unknown,
+    onEvent: (event: string, data: any) => void
+  ): Promise<void> {
+    let response: Response;
+    try {
+      response = await fetch(`${this.baseUrl}${endpoint}`, {
+        method: 'POST',
+        headers: this.buildHeaders({ Accept: 'text/event-stream' }),
+        body: JSON.stringify(data),
+      });
+    } catch (error) {
+      throw new ApiError(
+        error instanceof Error ? error.message : 'Network error',
+        0
+      );
+    }
+
+    if (!response.ok || !response.body) {
+      const errorData = await response.json().catch(() => ({}));
+      throw new ApiError(
+        errorData.message || `HTTP error! status: ${response.status}`,
+        response.status,
+        errorData
+      );
+    }
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+
+    while (true) {
+      const { value, done } = await reader.read();
+      if (done) break;
+      buffer += decoder.decode(value, { stream: true });
+
+      let boundary = buffer.indexOf('\n\n');
+      while (boundary !== -1) {
+        const frame = buffer.slice(0, boundary);
+        buffer = buffer.slice(boundary + 2);
+        boundary = buffer.indexOf('\n\n');
+
+        let event = 'message';
+        const dataLines: string[] = [];
+        for (const line of frame.split('\n')) {
+          if (line.startsWith('event:')) event = line.slice(6).trim();
+          else if (line.startsWith('data:')) dataLines.push(line.slice(5).trimStart());
+        }
+        if (dataLines.length) {
+          onEvent(event, JSON.parse(dataLines.join('\n')));
+        }
+      }
+    }
+  }
 }
 
 export const apiClient = new ApiClient();